@@ -0,0 +1,88 @@
+"""
+Persistent state for incremental runs.
+
+This module contains the LinkCache class, a small sqlite database that
+remembers which source/target directory pairs were fully linked and what
+their modification times were at the time, so unchanged directories can be
+skipped on the next run.
+"""
+
+import sqlite3
+from typing import Optional, Tuple
+
+# Bump when the schema changes; older databases are simply discarded.
+SCHEMA_VERSION = 1
+
+
+class LinkCache:
+    """
+    Remembers directory pairs whose files were all linked successfully.
+
+    A directory's entries can only change if its own mtime changes, and a
+    hardlinked file's content is shared with the source anyway, so a pair
+    whose source and target directory mtimes both match the stored values
+    needs no per-file work. This does not hold for reflink clones, which
+    are separate files whose content would go stale, so the cache is only
+    used for hardlinks. Entries are tied to a settings fingerprint
+    (exclude patterns, link mode) and are discarded when it changes.
+    """
+
+    def __init__(self, path: str, settings: str):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        try:
+            self._setup(settings)
+        except Exception:
+            self._db.close()
+            raise
+
+    def _setup(self, settings: str) -> None:
+        """Create the tables, discarding entries made with other settings."""
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        stored = dict(self._db.execute("SELECT key, value FROM meta"))
+        if stored != {"schema": str(SCHEMA_VERSION), "settings": settings}:
+            self._db.execute("DROP TABLE IF EXISTS dirs")
+            self._db.execute("DELETE FROM meta")
+            self._db.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [("schema", str(SCHEMA_VERSION)), ("settings", settings)],
+            )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            "source TEXT, target TEXT, source_mtime INTEGER, target_mtime INTEGER, "
+            "PRIMARY KEY (source, target))"
+        )
+
+    def lookup(self, source: str, target: str) -> Optional[Tuple[int, int]]:
+        """Return the stored (source_mtime, target_mtime) for a pair."""
+        row = self._db.execute(
+            "SELECT source_mtime, target_mtime FROM dirs "
+            "WHERE source = ? AND target = ?",
+            (source, target),
+        ).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def store(
+        self, source: str, target: str, source_mtime: int, target_mtime: int
+    ) -> None:
+        """Record that a pair was fully linked at the given mtimes."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO dirs "
+            "(source, target, source_mtime, target_mtime) VALUES (?, ?, ?, ?)",
+            (source, target, source_mtime, target_mtime),
+        )
+
+    def forget(self, source: str, target: str) -> None:
+        """Drop any stored state for a pair."""
+        self._db.execute(
+            "DELETE FROM dirs WHERE source = ? AND target = ?", (source, target)
+        )
+
+    def close(self) -> None:
+        """Commit pending changes and close the database."""
+        self._db.commit()
+        self._db.close()
@@ -5,17 +5,41 @@ This module contains the CLI argument parsing and main entry point for the
 mklndir command-line tool.
 """
 
+import os
 import sys
 import argparse
-from pathlib import Path
+from functools import lru_cache
 from typing import Optional
 
-from .core import DirectoryHardlinker
+from .core import (
+    AUTO_WORKERS,
+    REFLINK_MODES,
+    REFLINK_SUPPORTED,
+    DirectoryHardlinker,
+)
 from . import __version__
 
 
+def parse_workers(value: str) -> int:
+    """Parse a --workers value, which is a thread count or "auto"."""
+    if value == "auto":
+        return AUTO_WORKERS
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected a number or 'auto', got {value!r}"
+        ) from None
+
+
+@lru_cache(maxsize=None)
 def create_parser() -> argparse.ArgumentParser:
-    """Create and configure the argument parser."""
+    """
+    Create and configure the argument parser.
+
+    The parser is built once and shared by later calls; parse_args() does
+    not modify it, but callers must not add arguments to it.
+    """
     parser = argparse.ArgumentParser(
         prog="mklndir",
         description="Hardlink all files from source directory to target directory",
@@ -25,6 +49,10 @@ Examples:
   mklndir /path/to/source /path/to/target
   mklndir source_dir target_dir --verbose --dry-run
   mklndir src dst --overwrite --exclude "*.tmp" "*.log"
+  mklndir /data /backup/data --workers 8
+  mklndir /data /backup/data --workers auto
+  mklndir /btrfs/src /btrfs/copy --reflink auto
+  mklndir /data /backup/data --cache ~/.cache/mklndir-data.db
 
 Note: Hardlinks can only be created within the same filesystem.
         """,
@@ -34,8 +62,8 @@ Note: Hardlinks can only be created within the same filesystem.
         "--version", action="version", version=f"%(prog)s {__version__}"
     )
 
-    parser.add_argument("source", type=Path, help="Source directory path")
-    parser.add_argument("target", type=Path, help="Target directory path")
+    parser.add_argument("source", help="Source directory path")
+    parser.add_argument("target", help="Target directory path")
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="Enable verbose output"
     )
@@ -58,6 +86,30 @@ Note: Hardlinks can only be created within the same filesystem.
         metavar="PATTERN",
         help="Exclude files/directories matching these patterns",
     )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=parse_workers,
+        default=0,
+        metavar="N",
+        help="Link files using N worker threads; 'auto' uses four per CPU, "
+        "up to 32 (default: 0, link serially)",
+    )
+    parser.add_argument(
+        "--reflink",
+        default="never",
+        choices=REFLINK_MODES,
+        metavar="WHEN",
+        help="Create copy-on-write clones instead of hardlinks: auto falls back "
+        "to hardlinks where cloning is unsupported, always requires clones "
+        "(default: never)",
+    )
+    parser.add_argument(
+        "--cache",
+        metavar="PATH",
+        help="Remember fully linked directories in this database file and "
+        "skip them on later runs while they are unchanged",
+    )
     parser.add_argument(
         "--stats", action="store_true", help="Show operation statistics"
     )
@@ -67,45 +119,32 @@ Note: Hardlinks can only be created within the same filesystem.
 
 def validate_arguments(args) -> Optional[str]:
     """Validate command-line arguments and return error message if invalid."""
-    if not args.source.exists():
+    if not os.path.exists(args.source):
         return f"Source directory does not exist: {args.source}"
 
-    if not args.source.is_dir():
+    if not os.path.isdir(args.source):
         return f"Source is not a directory: {args.source}"
 
-    if args.target.exists() and not args.target.is_dir():
-        return f"Target exists but is not a directory: {args.target}"
+    if args.workers < 0:
+        return f"Number of workers must not be negative: {args.workers}"
 
-    return None
+    if args.reflink == "always" and not REFLINK_SUPPORTED:
+        return "Reflinks are not supported on this platform"
 
+    if args.cache is not None and args.reflink != "never":
+        return "--cache cannot be combined with --reflink"
 
-def check_filesystem_compatibility(source: Path, target: Path) -> None:
-    """Check and warn if source and target are on different filesystems."""
-    try:
-        source_stat = source.stat()
-        if target.exists():
-            target_stat = target.stat()
-            if source_stat.st_dev != target_stat.st_dev:
-                print(
-                    "Warning: Source and target appear to be on different filesystems.",
-                    file=sys.stderr,
-                )
-                print(
-                    "Hardlinks cannot be created across filesystems.", file=sys.stderr
-                )
-        else:
-            # Check parent directory
-            parent_stat = target.parent.stat()
-            if source_stat.st_dev != parent_stat.st_dev:
-                print(
-                    "Warning: Source and target appear to be on different filesystems.",
-                    file=sys.stderr,
-                )
-                print(
-                    "Hardlinks cannot be created across filesystems.", file=sys.stderr
-                )
-    except (OSError, AttributeError):
-        pass  # Can't check, proceed anyway
+    if args.cache is not None:
+        cache_dir = os.path.dirname(os.path.abspath(args.cache))
+        if not os.path.isdir(cache_dir):
+            return f"Cache directory does not exist: {cache_dir}"
+        if os.path.isdir(args.cache):
+            return f"Cache path is a directory: {args.cache}"
+
+    if os.path.exists(args.target) and not os.path.isdir(args.target):
+        return f"Target exists but is not a directory: {args.target}"
+
+    return None
 
 
 def main() -> int:
@@ -119,11 +158,10 @@ def main() -> int:
         print(f"Error: {error_msg}", file=sys.stderr)
         return 1
 
-    # Check filesystem compatibility
-    check_filesystem_compatibility(args.source, args.target)
-
     # Initialize hardlinker
-    hardlinker = DirectoryHardlinker(verbose=args.verbose, dry_run=args.dry_run)
+    hardlinker = DirectoryHardlinker(
+        verbose=args.verbose, dry_run=args.dry_run, cache_path=args.cache
+    )
 
     if args.dry_run:
         print("DRY RUN MODE - No actual changes will be made\n")
@@ -134,6 +172,8 @@ def main() -> int:
         target=args.target,
         overwrite=args.overwrite,
         exclude_patterns=args.exclude,
+        workers=args.workers,
+        reflink=args.reflink,
     )
 
     # Show statistics if requested or in verbose mode
@@ -6,30 +6,178 @@ hardlinking operations.
 """
 
 import os
+import re
+import sys
+import errno
+import time
 import fnmatch
-from pathlib import Path
-from typing import List, Optional
+import threading
+import itertools
+from functools import lru_cache
+from pathlib import PurePath
+from array import array
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, as_completed
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+    Union,
+)
+
+from .cache import LinkCache
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore
+
+# Number of buffered log lines written to stdout in a single call
+LOG_FLUSH_LINES = 1024
+
+# Link relative to open directory descriptors (linkat/fstatat/unlinkat)
+# where the platform supports it, so the kernel does not re-resolve the
+# full path for every file.
+_USE_DIR_FD = (
+    hasattr(os, "O_DIRECTORY")
+    and os.link in os.supports_dir_fd
+    and os.stat in os.supports_dir_fd
+    and os.unlink in os.supports_dir_fd
+)
+# O_PATH (Linux) opens a directory only as an anchor for the *at() calls,
+# which unlike O_RDONLY needs no read permission on it; path-based link()
+# only ever needed write and search permission.
+_DIR_OPEN_FLAGS = getattr(os, "O_PATH", os.O_RDONLY) | getattr(os, "O_DIRECTORY", 0)
+
+# Characters that make an exclude pattern a glob rather than a literal name
+_GLOB_CHARS = frozenset("*?[")
+
+# Distinct basenames whose exclude result is remembered during a run;
+# names such as __init__.py or .DS_Store recur throughout large trees
+_EXCLUDE_MEMO_SIZE = 4096
+
+# Worker threads used for "--workers auto": linking waits on the kernel
+# rather than the CPU, so several threads per core keep it busy
+AUTO_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Temporary names used while replacing a target: "<prefix><pid>.<n>" with a
+# process-wide counter, retried when a stale one from an interrupted run is
+# in the way
+_TMP_PREFIX = ".mklndir."
+_TMP_COUNTER = itertools.count()
+_TMP_ATTEMPTS = 100
+
+# Directories with pooled links still running before the walker waits
+_MAX_IN_FLIGHT_DIRS = 64
+
+# Source directories modified more recently than this are not recorded in
+# the cache, since a change within the same mtime tick would go unnoticed
+_CACHE_MIN_AGE_NS = 2 * 10**9
+
+# Statistics counters, indexed by position in DirectoryHardlinker._counts.
+# The first four double as the outcomes returned by _hardlink_file, so an
+# outcome can be counted with a single array store.
+_LINKED, _REFLINKED, _SKIPPED, _FAILED, _DIR_CREATED = range(5)
+_STAT_KEYS = ("files_linked", "files_reflinked", "skipped", "errors", "dirs_created")
+
+# Explanations for link failures worth more than the bare strerror text
+_LINK_ERR_MSG: Dict[Optional[int], str] = {
+    errno.EXDEV: "Cannot hardlink across filesystems",
+    errno.EMLINK: "Too many hardlinks for inode",
+    errno.EPERM: "Operation not permitted (immutable or append-only file?)",
+    errno.ENOSPC: "No space left on device",
+}
+
+# Copy-on-write clone ioctl (Linux FICLONE), supported by Btrfs, XFS and
+# others; errnos meaning the filesystem or file pair cannot be cloned
+REFLINK_MODES = ("never", "auto", "always")
+_FICLONE = 0x40049409
+REFLINK_SUPPORTED = fcntl is not None and sys.platform.startswith("linux")
+_REFLINK_UNSUPPORTED = {
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EINVAL,
+    errno.EXDEV,
+    errno.ENOSYS,
+}
+
+
+# ((source dir, target dir), source mtime) stored once a directory is linked
+_CacheRecord = Tuple[Tuple[str, str], int]
+_InFlight = Tuple[List["Future[int]"], List[int], Optional[_CacheRecord]]
 
 
 class DirectoryHardlinker:
     """Handles hardlinking of directory contents."""
 
-    def __init__(self, verbose: bool = False, dry_run: bool = False):
+    def __init__(
+        self,
+        verbose: bool = False,
+        dry_run: bool = False,
+        cache_path: Optional[str] = None,
+    ):
         self.verbose = verbose
         self.dry_run = dry_run
-        self.stats = {"files_linked": 0, "dirs_created": 0, "errors": 0, "skipped": 0}
+        self.cache_path = cache_path
+        self._cache: Optional[LinkCache] = None
+        self._counts = array("Q", [0] * len(_STAT_KEYS))
+        self._exclude_names: FrozenSet[str] = frozenset()
+        self._exclude_exts: FrozenSet[str] = frozenset()
+        self._name_excluded: Optional[Callable[[str], bool]] = None
+        self._path_re: Optional[Pattern[str]] = None
+        self._executor: Optional[Executor] = None
+        self._reflink = "never"
+        self._xdev_warned = False
+        self._log_buf: List[str] = []
+        self._log_lock = threading.Lock()
+        # With reflinks, (st_dev, st_ino) of multiply-linked sources -> the
+        # first target, so later names become hardlinks to that one clone
+        self._track_inodes = False
+        self._seen_inodes: Dict[Tuple[int, int], str] = {}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of the operation statistics, keyed by counter name."""
+        return dict(zip(_STAT_KEYS, self._counts))
 
     def log(self, message: str, level: str = "INFO") -> None:
-        """Log messages if verbose mode is enabled."""
+        """
+        Log messages if verbose mode is enabled.
+
+        Messages are buffered and written in batches of LOG_FLUSH_LINES to
+        avoid a stdout write per file; call flush_log() to emit the rest.
+        """
         if self.verbose:
-            print(f"[{level}] {message}")
+            with self._log_lock:
+                self._log_buf.append(f"[{level}] {message}\n")
+                if len(self._log_buf) >= LOG_FLUSH_LINES:
+                    self._write_log()
+
+    def flush_log(self) -> None:
+        """Write any buffered log messages to stdout."""
+        with self._log_lock:
+            self._write_log()
+
+    def _write_log(self) -> None:
+        """Write out the log buffer; the caller must hold the log lock."""
+        if self._log_buf:
+            sys.stdout.write("".join(self._log_buf))
+            sys.stdout.flush()
+            self._log_buf.clear()
 
     def hardlink_directory(
         self,
-        source: Path,
-        target: Path,
+        source: Union[str, "os.PathLike[str]"],
+        target: Union[str, "os.PathLike[str]"],
         overwrite: bool = False,
         exclude_patterns: Optional[List[str]] = None,
+        workers: int = 0,
+        reflink: str = "never",
     ) -> bool:
         """
         Hardlink all files from source directory to target directory.
@@ -39,142 +187,781 @@ class DirectoryHardlinker:
             target: Target directory path
             overwrite: Whether to overwrite existing files
             exclude_patterns: List of patterns to exclude (glob-style)
+            workers: Number of threads used to link files; 0 links serially
+            reflink: "never" to hardlink, "auto" to clone files where the
+                filesystem supports it and hardlink otherwise, or "always"
+                to require clones
 
         Returns:
             True if successful, False otherwise
         """
-        if not source.exists():
+        # Normalised once the way pathlib does ("./src/" -> "src", but ".."
+        # kept), so full-path exclude patterns see the same paths as before
+        try:
+            return self._hardlink_directory(
+                os.fspath(PurePath(source)),
+                os.fspath(PurePath(target)),
+                overwrite,
+                exclude_patterns,
+                workers,
+                reflink,
+            )
+        finally:
+            self.flush_log()
+
+    def _hardlink_directory(
+        self,
+        source: str,
+        target: str,
+        overwrite: bool,
+        exclude_patterns: Optional[List[str]],
+        workers: int,
+        reflink: str,
+    ) -> bool:
+        """Validate arguments, set up the target and run the traversal."""
+        if reflink not in REFLINK_MODES:
+            raise ValueError(f"Invalid reflink mode: {reflink!r}")
+
+        # Skipping unchanged directories is only safe for hardlinks, which
+        # share their content with the source; a clone would go stale
+        if self.cache_path is not None and reflink != "never":
+            raise ValueError("A cache cannot be used together with reflinks")
+
+        if reflink == "always" and not REFLINK_SUPPORTED:
+            self.log("Reflinks are not supported on this platform", "ERROR")
+            return False
+
+        if not os.path.exists(source):
             self.log(f"Source directory does not exist: {source}", "ERROR")
             return False
 
-        if not source.is_dir():
+        if not os.path.isdir(source):
             self.log(f"Source is not a directory: {source}", "ERROR")
             return False
 
-        # Create target directory if it doesn't exist
-        if not target.exists():
-            if not self.dry_run:
-                target.mkdir(parents=True, exist_ok=True)
+        # Patterns without a separator can only ever match a basename, so
+        # only those containing one are tested against the full path.
+        patterns = exclude_patterns or []
+        self._exclude_names, self._exclude_exts, name_globs = self._split_exclude(
+            [p for p in patterns if "/" not in p]
+        )
+        name_re = self._compile_exclude(name_globs)
+        self._name_excluded = None
+        if name_re is not None:
+            match = name_re.match
+            self._name_excluded = lru_cache(maxsize=_EXCLUDE_MEMO_SIZE)(
+                lambda name: match(name) is not None
+            )
+        self._path_re = self._compile_exclude([p for p in patterns if "/" in p])
+        self._seen_inodes.clear()
+        self._reflink = reflink if REFLINK_SUPPORTED else "never"
+        # Decided once per run: "auto" may fall back to "never" part way
+        # through, and clones made before that must still be reused
+        self._track_inodes = self._reflink != "never"
+        self._xdev_warned = False
+
+        if self.dry_run:
+            # Nothing is linked in a dry run, so no EXDEV would reveal this;
+            # compare devices with the target or its nearest existing parent
+            existing = os.path.abspath(target)
+            while not os.path.exists(existing):
+                existing = os.path.dirname(existing)
+            try:
+                if os.stat(existing).st_dev != os.stat(source).st_dev:
+                    self._warn_cross_device()
+            except OSError:
+                pass  # Can't check, proceed anyway
+
+        # Create target directory if it doesn't exist; makedirs() reports an
+        # existing one itself, so there is no separate existence check
+        if self.dry_run:
+            created = not os.path.exists(target)
+        else:
+            try:
+                os.makedirs(target)
+                created = True
+            except FileExistsError:
+                created = False
+        if created:
             self.log(f"Created target directory: {target}")
-            self.stats["dirs_created"] += 1
+            self._counts[_DIR_CREATED] += 1
 
         try:
-            return self._hardlink_recursive(source, target, overwrite, exclude_patterns)
+            # Opened only now, inside the try, so the finally below closes
+            # it. A dry run neither reads nor updates the cache, so it
+            # cannot reset the database when its settings differ.
+            if self.cache_path is not None and not self.dry_run:
+                try:
+                    self._cache = LinkCache(
+                        self.cache_path, repr((sorted(patterns), overwrite, reflink))
+                    )
+                except Exception as e:
+                    # Printed even without -v, since the run stops here
+                    print(
+                        f"Error: Cannot open cache {self.cache_path}: {e}",
+                        file=sys.stderr,
+                    )
+                    return False
+
+            if workers > 0:
+                # os.link() releases the GIL, so threads overlap the syscalls
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    self._executor = executor
+                    return self._walk(source, target, overwrite)
+            return self._walk(source, target, overwrite)
         except Exception as e:
             self.log(f"Error during hardlinking: {e}", "ERROR")
             return False
+        finally:
+            self._executor = None
+            if self._cache is not None:
+                self._cache.close()
+                self._cache = None
 
-    def _should_exclude(
-        self, path: Path, exclude_patterns: Optional[List[str]]
-    ) -> bool:
-        """Check if a path should be excluded based on patterns."""
-        if not exclude_patterns:
-            return False
+    @staticmethod
+    def _split_exclude(
+        patterns: List[str],
+    ) -> Tuple[FrozenSet[str], FrozenSet[str], List[str]]:
+        """
+        Sort basename patterns by how cheaply they can be matched.
 
-        path_str = str(path)
-        for pattern in exclude_patterns:
-            if fnmatch.fnmatch(path_str, pattern) or fnmatch.fnmatch(
-                path.name, pattern
+        Returns the literal names, the extensions of plain "*.ext" globs
+        (matched with set lookups) and the remaining globs, which need the
+        regex.
+        """
+        names = set()
+        exts = set()
+        globs = []
+        for pattern in patterns:
+            if _GLOB_CHARS.isdisjoint(pattern):
+                names.add(pattern)
+            elif (
+                pattern.startswith("*.")
+                and "." not in pattern[2:]
+                and _GLOB_CHARS.isdisjoint(pattern[2:])
             ):
+                exts.add(pattern[2:])
+            else:
+                globs.append(pattern)
+        return frozenset(names), frozenset(exts), globs
+
+    @staticmethod
+    def _compile_exclude(
+        exclude_patterns: Optional[List[str]],
+    ) -> Optional[Pattern[str]]:
+        """Compile glob patterns into a single alternation regex."""
+        if not exclude_patterns:
+            return None
+
+        return re.compile(
+            "|".join(f"(?:{fnmatch.translate(p)})" for p in exclude_patterns)
+        )
+
+    def _should_exclude(self, path: str, name: str) -> bool:
+        """Check if a path should be excluded based on patterns."""
+        if name in self._exclude_names:
+            return True
+        if self._exclude_exts:
+            _, dot, ext = name.rpartition(".")
+            if dot and ext in self._exclude_exts:
                 return True
-        return False
+        if self._name_excluded is not None and self._name_excluded(name):
+            return True
+        return self._path_re is not None and self._path_re.match(path) is not None
 
-    def _hardlink_recursive(
+    def _walk(
         self,
-        source: Path,
-        target: Path,
+        source: str,
+        target: str,
         overwrite: bool,
-        exclude_patterns: Optional[List[str]],
     ) -> bool:
-        """Recursively hardlink files from source to target."""
-        success = True
+        """
+        Hardlink files from source to target, walking the tree breadth first.
+
+        Directories are processed from an explicit queue rather than by
+        recursion, so arbitrarily deep trees are safe. For each directory
+        the entries are read once with os.scandir (file type checks come
+        from the cached DirEntry), its files are linked in one contiguous
+        burst, and only then are its subdirectories created and queued.
+        Keeping each directory's links together avoids interleaving them
+        with work elsewhere in the tree, which keeps the directory hot in
+        the kernel's dentry cache.
+
+        With a cache, a directory whose source and target mtimes match the
+        last fully successful run is still scanned for subdirectories, but
+        its files are not linked again.
+        """
+        # Bind hot attributes locally. Only this thread updates the
+        # counters: pooled links hand their outcome back to be counted here.
+        dry_run = self.dry_run
+        verbose = self.verbose
+        log = self.log
+        should_exclude = self._should_exclude
+        cache = self._cache
+        sep = os.sep
+        counts = self._counts
+        errors_before = counts[_FAILED]
+
+        queue: Deque[Tuple[str, str]] = deque([(source, target)])
+        # Directories whose pooled links are still running, together with
+        # the descriptors those links use and their cache record; drained
+        # oldest first.
+        in_flight: Deque[_InFlight] = deque()
 
         try:
-            for item in source.iterdir():
-                if self._should_exclude(item, exclude_patterns):
-                    self.log(f"Excluding: {item}")
-                    self.stats["skipped"] += 1
-                    continue
+            while queue:
+                src_dir, dst_dir = queue.popleft()
+                files: List["os.DirEntry[str]"] = []
+                subdirs: List["os.DirEntry[str]"] = []
+                src_mtime: Optional[int] = None
+
+                try:
+                    # Read before scanning, so changes made during the scan
+                    # show up as a newer mtime on the next run
+                    if cache is not None:
+                        src_mtime = os.stat(src_dir).st_mtime_ns
+
+                    with os.scandir(src_dir) as it:
+                        for entry in it:
+                            if should_exclude(entry.path, entry.name):
+                                if verbose:
+                                    log(f"Excluding: {entry.path}")
+                                counts[_SKIPPED] += 1
+                            elif entry.is_file(follow_symlinks=False):
+                                files.append(entry)
+                            elif entry.is_dir(follow_symlinks=False):
+                                subdirs.append(entry)
+                            else:
+                                if verbose:
+                                    log(f"Skipping special file: {entry.path}", "WARN")
+                                counts[_SKIPPED] += 1
+
+                    # Paths are built by concatenation rather than
+                    # os.path.join; dst_dir has no trailing separator
+                    # except when it is the filesystem root.
+                    dst_prefix = dst_dir if dst_dir.endswith(sep) else dst_dir + sep
+
+                    record: Optional[_CacheRecord] = None
+                    if files:
+                        record = self._link_files(
+                            src_dir,
+                            dst_dir,
+                            dst_prefix,
+                            files,
+                            overwrite,
+                            src_mtime,
+                            in_flight,
+                        )
+
+                    # Create directory structure and queue it
+                    for entry in subdirs:
+                        target_item = dst_prefix + entry.name
+                        if dry_run:
+                            created = not os.path.lexists(target_item)
+                        else:
+                            try:
+                                os.mkdir(target_item)
+                                created = True
+                            except FileExistsError:
+                                created = False
+                        if created:
+                            if verbose:
+                                log(f"Created directory: {target_item}")
+                            counts[_DIR_CREATED] += 1
+                        queue.append((entry.path, target_item))
+
+                    # Stored last, so the recorded target mtime already
+                    # reflects any subdirectories created above
+                    self._cache_store(record)
+
+                except PermissionError as e:
+                    log(f"Permission denied: {e}", "ERROR")
+                    counts[_FAILED] += 1
+                except Exception as e:
+                    log(f"Unexpected error: {e}", "ERROR")
+                    counts[_FAILED] += 1
+        finally:
+            while in_flight:
+                self._drain(*in_flight.popleft())
+
+        return counts[_FAILED] == errors_before
+
+    def _link_files(
+        self,
+        src_dir: str,
+        dst_dir: str,
+        dst_prefix: str,
+        files: List["os.DirEntry[str]"],
+        overwrite: bool,
+        src_mtime: Optional[int],
+        in_flight: Deque["_InFlight"],
+    ) -> Optional["_CacheRecord"]:
+        """
+        Link all files of one directory.
+
+        Where supported, the source and target directories are opened once
+        and files are linked relative to those descriptors. With a worker
+        pool the links are queued on in_flight instead of waited for.
+
+        Returns:
+            The cache record to store once the directory is complete, or
+            None if there is nothing to record (no cache, unchanged since
+            the last run, errors, or links still pending in the pool)
+        """
+        verbose = self.verbose
+        log = self.log
+        hardlink_file = self._hardlink_file
+        executor = self._executor
+        counts = self._counts
+        link = os.link
+
+        record: Optional[_CacheRecord] = None
+        if src_mtime is not None:
+            record = self._cache_check(src_dir, dst_dir, src_mtime)
+            if record is None:
+                if verbose:
+                    log(f"Unchanged since last run: {src_dir}")
+                counts[_SKIPPED] += len(files)
+                return None
 
-                target_item = target / item.name
+        errors_in_dir = counts[_FAILED]
+        fds: List[int] = []
+        dir_fds: Optional[Tuple[int, int]] = None
+        if _USE_DIR_FD and not self.dry_run:
+            try:
+                fds.append(os.open(src_dir, _DIR_OPEN_FLAGS))
+                fds.append(os.open(dst_dir, _DIR_OPEN_FLAGS))
+                dir_fds = (fds[0], fds[1])
+            except OSError:
+                # Link by path instead, which may still be permitted
+                for fd in fds:
+                    os.close(fd)
+                fds = []
 
-                if item.is_file():
-                    success &= self._hardlink_file(item, target_item, overwrite)
-                elif item.is_dir():
-                    # Create directory structure and recurse
-                    if not target_item.exists():
-                        if not self.dry_run:
-                            target_item.mkdir(parents=True, exist_ok=True)
-                        self.log(f"Created directory: {target_item}")
-                        self.stats["dirs_created"] += 1
+        # Common case: a plain link relative to the directory descriptors,
+        # done inline without a method call. An existing target is skipped
+        # here too; any other error is reported as is, without retrying.
+        fast_path = (
+            dir_fds is not None
+            and executor is None
+            and not overwrite
+            and self._reflink == "never"
+            and not self._track_inodes
+        )
 
-                    success &= self._hardlink_recursive(
-                        item, target_item, overwrite, exclude_patterns
+        # The source stat is only needed to compare inodes against an
+        # existing target when overwriting, or to track inodes
+        track_inodes = self._track_inodes
+        need_stat = overwrite or track_inodes
+
+        pending: List["Future[int]"] = []
+        try:
+            for entry in files:
+                if fast_path:
+                    name = entry.name
+                    try:
+                        link(name, name, src_dir_fd=fds[0], dst_dir_fd=fds[1])
+                    except FileExistsError:
+                        if verbose:
+                            log(f"Target exists, skipping: {dst_prefix}{name}", "WARN")
+                        counts[_SKIPPED] += 1
+                    except OSError as e:
+                        counts[self._link_failed(e, entry.path, dst_prefix + name)] += 1
+                    else:
+                        if verbose:
+                            log(f"Hardlinked: {entry.path} -> {dst_prefix}{name}")
+                        counts[_LINKED] += 1
+                    continue
+
+                target_item = dst_prefix + entry.name
+                source_stat = entry.stat(follow_symlinks=False) if need_stat else None
+                # Tracked (multiply-linked) sources are linked by this thread
+                # rather than the pool, so only it uses _seen_inodes and a
+                # later name always finds the clone made for an earlier one
+                if executor is not None and not (
+                    track_inodes
+                    and source_stat is not None
+                    and source_stat.st_nlink > 1
+                ):
+                    pending.append(
+                        executor.submit(
+                            hardlink_file,
+                            entry.path,
+                            target_item,
+                            overwrite,
+                            source_stat,
+                            dir_fds,
+                        )
                     )
                 else:
-                    self.log(f"Skipping special file: {item}", "WARN")
-                    self.stats["skipped"] += 1
+                    outcome = hardlink_file(
+                        entry.path, target_item, overwrite, source_stat, dir_fds
+                    )
+                    counts[outcome] += 1
+        finally:
+            # The descriptors must stay open until pooled links complete;
+            # otherwise they can be closed right away.
+            if pending:
+                in_flight.append((pending, fds, record))
+            else:
+                for fd in fds:
+                    os.close(fd)
 
-        except PermissionError as e:
-            self.log(f"Permission denied: {e}", "ERROR")
-            self.stats["errors"] += 1
-            success = False
-        except Exception as e:
-            self.log(f"Unexpected error: {e}", "ERROR")
-            self.stats["errors"] += 1
-            success = False
+        if pending:
+            # Bound the number of directories with pending links
+            if len(in_flight) > _MAX_IN_FLIGHT_DIRS:
+                self._drain(*in_flight.popleft())
+            return None
+
+        return record if counts[_FAILED] == errors_in_dir else None
+
+    def _drain(
+        self,
+        pending: List["Future[int]"],
+        fds: List[int],
+        record: Optional["_CacheRecord"],
+    ) -> None:
+        """Count a directory's pooled link outcomes, then close its fds."""
+        counts = self._counts
+        errors_in_dir = counts[_FAILED]
+        try:
+            for future in as_completed(pending):
+                counts[future.result()] += 1
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+        if counts[_FAILED] == errors_in_dir:
+            self._cache_store(record)
+
+    def _cache_check(
+        self, src_dir: str, dst_dir: str, src_mtime: int
+    ) -> Optional["_CacheRecord"]:
+        """
+        Look a directory pair up in the cache.
+
+        Returns None if neither directory changed since it was last fully
+        linked, otherwise the record to store once linking succeeds.
+        """
+        assert self._cache is not None
+        key = (os.path.abspath(src_dir), os.path.abspath(dst_dir))
+        dst_mtime = os.stat(dst_dir).st_mtime_ns
+        if self._cache.lookup(*key) == (src_mtime, dst_mtime):
+            return None
+        return (key, src_mtime)
+
+    def _cache_store(self, record: Optional["_CacheRecord"]) -> None:
+        """Record a directory pair as fully linked, if it is safe to."""
+        if record is None or self._cache is None:
+            return
 
-        return success
+        (src_dir, dst_dir), src_mtime = record
+        if time.time_ns() - src_mtime < _CACHE_MIN_AGE_NS:
+            self._cache.forget(src_dir, dst_dir)
+            return
+        # The target mtime is read after linking, so it includes our changes
+        dst_mtime = os.stat(dst_dir).st_mtime_ns
+        self._cache.store(src_dir, dst_dir, src_mtime, dst_mtime)
 
     def _hardlink_file(
-        self, source_file: Path, target_file: Path, overwrite: bool
-    ) -> bool:
-        """Create a hardlink for a single file."""
+        self,
+        source_file: str,
+        target_file: str,
+        overwrite: bool,
+        source_stat: Optional[os.stat_result] = None,
+        dir_fds: Optional[Tuple[int, int]] = None,
+    ) -> int:
+        """
+        Create a hardlink for a single file.
+
+        The link is attempted straight away and an existing target is only
+        examined when the kernel reports EEXIST, so the common case costs a
+        single link() call. source_stat may be passed in from the caller's
+        DirEntry to avoid stat'ing the source again when checking an
+        existing target. When dir_fds holds open (source, target) parent
+        directory descriptors, all operations are done relative to them
+        using the file's name.
+
+        Returns:
+            _LINKED, _REFLINKED, _SKIPPED or _FAILED; the caller does the
+            accounting
+        """
+        verbose = self.verbose
+        src_fd: Optional[int] = None
+        dst_fd: Optional[int] = None
+        if dir_fds is not None:
+            src_fd, dst_fd = dir_fds
+            src_path = dst_path = os.path.basename(target_file)
+        else:
+            src_path, dst_path = source_file, target_file
+
         try:
-            # Check if target already exists
-            if target_file.exists():
+            # A clone is a new inode, so a source linked under several names
+            # would otherwise become several independent clones; instead,
+            # later names are hardlinked to the target created first.
+            inode_key = None
+            first_target = None
+            if (
+                self._track_inodes
+                and source_stat is not None
+                and source_stat.st_nlink > 1
+            ):
+                inode_key = (source_stat.st_dev, source_stat.st_ino)
+                first_target = self._seen_inodes.get(inode_key)
+
+            try:
+                outcome = self._create_target(
+                    src_path, dst_path, src_fd, dst_fd, first_target, target_file
+                )
+            except FileExistsError:
                 if not overwrite:
-                    self.log(f"Target exists, skipping: {target_file}", "WARN")
-                    self.stats["skipped"] += 1
-                    return True
-                else:
-                    # Check if they're already hardlinked
-                    if source_file.samefile(target_file):
+                    if verbose:
+                        self.log(f"Target exists, skipping: {target_file}", "WARN")
+                    return _SKIPPED
+
+                # Check if they're already hardlinked
+                target_stat = os.lstat(dst_path, dir_fd=dst_fd)
+                if source_stat is None:
+                    source_stat = os.lstat(src_path, dir_fd=src_fd)
+                if (
+                    source_stat.st_ino == target_stat.st_ino
+                    and source_stat.st_dev == target_stat.st_dev
+                ):
+                    if verbose:
                         self.log(f"Already hardlinked: {target_file}")
-                        self.stats["skipped"] += 1
-                        return True
+                    return _SKIPPED
 
-                    if not self.dry_run:
-                        target_file.unlink()  # Remove existing file
-                    self.log(f"Removed existing file: {target_file}")
+                if verbose:
+                    self.log(f"Replacing existing file: {target_file}")
+                if self.dry_run:
+                    outcome = self._create_target(
+                        src_path,
+                        dst_path,
+                        src_fd,
+                        dst_fd,
+                        first_target,
+                        target_file,
+                        replacing=True,
+                    )
+                else:
+                    outcome = self._replace_target(
+                        src_path, dst_path, src_fd, dst_fd, first_target, target_file
+                    )
 
-            # Create the hardlink
-            if not self.dry_run:
-                os.link(str(source_file), str(target_file))
+            if inode_key is not None:
+                self._seen_inodes.setdefault(inode_key, target_file)
 
-            self.log(f"Hardlinked: {source_file} -> {target_file}")
-            self.stats["files_linked"] += 1
-            return True
+            if verbose:
+                action = "Reflinked" if outcome == _REFLINKED else "Hardlinked"
+                self.log(f"{action}: {source_file} -> {target_file}")
+            return outcome
 
         except OSError as e:
-            if e.errno == 18:  # EXDEV - Cross-device link
-                self.log(
-                    f"Cannot hardlink across filesystems: {source_file} -> {target_file}",
-                    "ERROR",
-                )
-            else:
-                self.log(f"Error hardlinking {source_file}: {e}", "ERROR")
-            self.stats["errors"] += 1
-            return False
+            return self._link_failed(e, source_file, target_file)
         except Exception as e:
             self.log(f"Unexpected error hardlinking {source_file}: {e}", "ERROR")
-            self.stats["errors"] += 1
+            return _FAILED
+
+    def _replace_target(
+        self,
+        src_path: str,
+        dst_path: str,
+        src_fd: Optional[int],
+        dst_fd: Optional[int],
+        first_target: Optional[str],
+        target_file: str,
+    ) -> int:
+        """
+        Replace an existing target with a new link (or clone).
+
+        The link is made under a short temporary name in the same directory
+        and renamed over the old file, so the target is never missing if
+        the run is interrupted. If the directory rejects even that name
+        (ENAMETOOLONG), the old file is removed and the link made directly.
+        """
+        tmp_dir = os.path.dirname(dst_path)
+        for _ in range(_TMP_ATTEMPTS):
+            tmp_path = os.path.join(
+                tmp_dir, f"{_TMP_PREFIX}{os.getpid()}.{next(_TMP_COUNTER)}"
+            )
+            try:
+                outcome = self._create_target(
+                    src_path, tmp_path, src_fd, dst_fd, first_target, target_file
+                )
+                break
+            except FileExistsError:
+                continue
+            except OSError as e:
+                if e.errno != errno.ENAMETOOLONG:
+                    raise
+                os.unlink(dst_path, dir_fd=dst_fd)
+                return self._create_target(
+                    src_path, dst_path, src_fd, dst_fd, first_target, target_file
+                )
+        else:
+            raise FileExistsError(
+                errno.EEXIST, "No free temporary name for replacement", target_file
+            )
+
+        try:
+            os.rename(tmp_path, dst_path, src_dir_fd=dst_fd, dst_dir_fd=dst_fd)
+        except OSError:
+            os.unlink(tmp_path, dir_fd=dst_fd)
+            raise
+        return outcome
+
+    def _warn_cross_device(self) -> None:
+        """Warn once per run that source and target are on different devices."""
+        if not self._xdev_warned:
+            self._xdev_warned = True
+            print(
+                "Warning: Source and target appear to be on different "
+                "filesystems.\nHardlinks cannot be created across filesystems.",
+                file=sys.stderr,
+            )
+
+    def _link_failed(self, e: OSError, source_file: str, target_file: str) -> int:
+        """Report a failed link and return the _FAILED outcome."""
+        if e.errno == errno.EXDEV:
+            # Reported here rather than probed up front: the first link
+            # attempt tells us for free
+            self._warn_cross_device()
+        msg = _LINK_ERR_MSG.get(e.errno)
+        if msg:
+            self.log(f"{msg}: {source_file} -> {target_file}", "ERROR")
+        else:
+            self.log(f"Error hardlinking {source_file}: {e}", "ERROR")
+        return _FAILED
+
+    def _create_target(
+        self,
+        src_path: str,
+        dst_path: str,
+        src_fd: Optional[int],
+        dst_fd: Optional[int],
+        first_target: Optional[str],
+        target_file: str,
+        replacing: bool = False,
+    ) -> int:
+        """
+        Create the target as a hardlink (or clone) of the source.
+
+        Raises FileExistsError if the target already exists. In dry-run
+        mode nothing is created, so the target is probed for instead,
+        unless it is one that would just have been removed (replacing).
+        """
+        dry_run = self.dry_run
+        if dry_run and not replacing:
+            try:
+                os.lstat(dst_path, dir_fd=dst_fd)
+            except FileNotFoundError:
+                pass
+            else:
+                raise FileExistsError(
+                    errno.EEXIST, os.strerror(errno.EEXIST), target_file
+                )
+
+        if first_target is not None:
+            if not dry_run:
+                os.link(first_target, dst_path, dst_dir_fd=dst_fd)
+            return _LINKED
+
+        if self._reflink != "never" and self._try_reflink(
+            src_path, dst_path, src_fd, dst_fd, target_file
+        ):
+            return _REFLINKED
+
+        if not dry_run:
+            os.link(src_path, dst_path, src_dir_fd=src_fd, dst_dir_fd=dst_fd)
+        return _LINKED
+
+    def _try_reflink(
+        self,
+        src_path: str,
+        dst_path: str,
+        src_fd: Optional[int],
+        dst_fd: Optional[int],
+        target_file: str,
+    ) -> bool:
+        """
+        Clone the file according to the reflink mode.
+
+        Returns True if the target was created as a clone. In "auto" mode
+        the first file the filesystem refuses to clone switches the rest
+        of the run to plain hardlinks; in "always" mode it is an error.
+        """
+        if self.dry_run:
+            return self._reflink == "always"
+
+        try:
+            if self._clone_file(src_path, dst_path, src_fd, dst_fd):
+                return True
+        except PermissionError:
+            # Cloning reads the source, a hardlink does not; only this
+            # file falls back, the filesystem may still clone others
+            if self._reflink == "always":
+                raise
             return False
 
+        if self._reflink == "always":
+            raise OSError(errno.EOPNOTSUPP, "Cannot reflink", target_file)
+
+        self._reflink = "never"
+        return False
+
+    @staticmethod
+    def _clone_file(
+        src_path: str,
+        dst_path: str,
+        src_fd: Optional[int],
+        dst_fd: Optional[int],
+    ) -> bool:
+        """
+        Create dst_path as a copy-on-write clone of src_path via FICLONE.
+
+        The clone keeps the source's permission bits (including setuid and
+        setgid) and timestamps, and its owner and group where the process
+        may set them. Returns False, leaving no target behind, if the
+        filesystem cannot clone the file; other errors are raised.
+        """
+        src = os.open(src_path, os.O_RDONLY, dir_fd=src_fd)
+        try:
+            st = os.fstat(src)
+            dst = os.open(
+                dst_path,
+                os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+                st.st_mode & 0o7777,
+                dir_fd=dst_fd,
+            )
+            try:
+                fcntl.ioctl(dst, _FICLONE, src)
+                try:
+                    os.fchown(dst, st.st_uid, st.st_gid)
+                except PermissionError:
+                    pass  # not root: keep our own ownership
+                # After fchown(), which clears setuid/setgid; the mode given
+                # to open() was also reduced by the umask
+                os.fchmod(dst, st.st_mode & 0o7777)
+                os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+            except OSError as e:
+                os.close(dst)
+                os.unlink(dst_path, dir_fd=dst_fd)
+                if e.errno in _REFLINK_UNSUPPORTED:
+                    return False
+                raise
+            os.close(dst)
+        finally:
+            os.close(src)
+        return True
+
     def print_stats(self) -> None:
         """Print statistics about the hardlinking operation."""
+        self.flush_log()
+        stats = self.stats
         print("\nOperation Summary:")
-        print(f"  Files hardlinked: {self.stats['files_linked']}")
-        print(f"  Directories created: {self.stats['dirs_created']}")
-        print(f"  Files skipped: {self.stats['skipped']}")
-        print(f"  Errors: {self.stats['errors']}")
+        print(f"  Files hardlinked: {stats['files_linked']}")
+        if stats["files_reflinked"]:
+            print(f"  Files reflinked: {stats['files_reflinked']}")
+        print(f"  Directories created: {stats['dirs_created']}")
+        print(f"  Files skipped: {stats['skipped']}")
+        print(f"  Errors: {stats['errors']}")
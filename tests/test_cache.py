@@ -0,0 +1,193 @@
+"""
+Tests for the incremental-run cache (--cache).
+"""
+
+import os
+import sqlite3
+import time
+
+import pytest
+
+from mklndir import core
+from mklndir.cache import LinkCache
+from mklndir.core import DirectoryHardlinker
+
+
+def create_source(path):
+    """Create a small source tree whose directories look settled."""
+    (path / "sub").mkdir(parents=True)
+    (path / "a.txt").write_text("a")
+    (path / "b.txt").write_text("b")
+    (path / "sub" / "c.txt").write_text("c")
+    age_directories(path)
+
+
+def age_directories(path):
+    """Move directory mtimes an hour back, past the cache's age guard."""
+    old = time.time_ns() - 3600 * 10**9
+    for root, _, _ in os.walk(path):
+        os.utime(root, ns=(old, old))
+
+
+def cached_dirs(cache_path):
+    """Number of directory pairs recorded in a cache database."""
+    db = sqlite3.connect(cache_path)
+    try:
+        return db.execute("SELECT COUNT(*) FROM dirs").fetchone()[0]
+    finally:
+        db.close()
+
+
+def run(source, target, cache_path, **kwargs):
+    dry_run = kwargs.pop("dry_run", False)
+    hardlinker = DirectoryHardlinker(dry_run=dry_run, cache_path=str(cache_path))
+    assert hardlinker.hardlink_directory(source, target, **kwargs)
+    return hardlinker.stats
+
+
+def forbid_links(monkeypatch):
+    """Make any further attempt to create a link fail the test."""
+
+    def link(*args, **kwargs):
+        raise AssertionError(f"unexpected link: {args}")
+
+    monkeypatch.setattr(core.os, "link", link)
+
+
+class TestLinkCache:
+    """Test the LinkCache database directly."""
+
+    def test_lookup_returns_stored_mtimes(self, tmp_path):
+        cache = LinkCache(str(tmp_path / "cache.db"), "settings")
+        cache.store("/src", "/dst", 1, 2)
+        cache.close()
+
+        cache = LinkCache(str(tmp_path / "cache.db"), "settings")
+        assert cache.lookup("/src", "/dst") == (1, 2)
+        assert cache.lookup("/src", "/other") is None
+        cache.close()
+
+    def test_changed_settings_discard_entries(self, tmp_path):
+        cache = LinkCache(str(tmp_path / "cache.db"), "settings")
+        cache.store("/src", "/dst", 1, 2)
+        cache.close()
+
+        cache = LinkCache(str(tmp_path / "cache.db"), "other settings")
+        assert cache.lookup("/src", "/dst") is None
+        cache.close()
+
+    def test_forget_drops_entry(self, tmp_path):
+        cache = LinkCache(str(tmp_path / "cache.db"), "settings")
+        cache.store("/src", "/dst", 1, 2)
+        cache.forget("/src", "/dst")
+        assert cache.lookup("/src", "/dst") is None
+        cache.close()
+
+
+class TestIncrementalRuns:
+    """Test DirectoryHardlinker with a cache across runs."""
+
+    def test_unchanged_tree_is_not_relinked(self, tmp_path, monkeypatch):
+        source, target = tmp_path / "source", tmp_path / "target"
+        cache_path = tmp_path / "cache.db"
+        create_source(source)
+
+        stats = run(source, target, cache_path)
+        assert stats["files_linked"] == 3
+        assert cached_dirs(cache_path) == 2
+
+        forbid_links(monkeypatch)
+        stats = run(source, target, cache_path)
+        assert stats["files_linked"] == 0
+        assert stats["skipped"] == 3
+
+    def test_changed_settings_relink(self, tmp_path, monkeypatch):
+        source, target = tmp_path / "source", tmp_path / "target"
+        cache_path = tmp_path / "cache.db"
+        create_source(source)
+        run(source, target, cache_path)
+
+        attempts = []
+        monkeypatch.setattr(core.os, "link", lambda *a, **k: attempts.append(a))
+        run(source, target, cache_path, exclude_patterns=["*.log"])
+        assert len(attempts) == 3
+
+    def test_deleted_target_file_is_relinked(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        cache_path = tmp_path / "cache.db"
+        create_source(source)
+        run(source, target, cache_path)
+
+        (target / "sub" / "c.txt").unlink()
+        stats = run(source, target, cache_path)
+        assert stats["files_linked"] == 1
+        assert (target / "sub" / "c.txt").samefile(source / "sub" / "c.txt")
+
+    def test_recently_modified_source_is_not_recorded(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        cache_path = tmp_path / "cache.db"
+        create_source(source)
+        (source / "sub" / "d.txt").write_text("d")  # sub's mtime is now
+
+        run(source, target, cache_path)
+        cache = LinkCache(str(cache_path), repr(([], False, "never")))
+        assert cache.lookup(str(source), str(target)) is not None
+        assert cache.lookup(str(source / "sub"), str(target / "sub")) is None
+        cache.close()
+
+        stats = run(source, target, cache_path)
+        assert stats["skipped"] == 4  # two cached, two existing targets
+
+    def test_reflinks_are_refused(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        create_source(source)
+        hardlinker = DirectoryHardlinker(cache_path=str(tmp_path / "cache.db"))
+        with pytest.raises(ValueError):
+            hardlinker.hardlink_directory(source, target, reflink="auto")
+        assert not (tmp_path / "cache.db").exists()
+
+    def test_unopenable_cache_is_reported(self, tmp_path, capsys):
+        source, target = tmp_path / "source", tmp_path / "target"
+        cache_path = tmp_path / "cache.db"
+        create_source(source)
+        cache_path.write_bytes(b"not a database" * 100)
+
+        hardlinker = DirectoryHardlinker(cache_path=str(cache_path))
+        assert not hardlinker.hardlink_directory(source, target)
+        assert "Cannot open cache" in capsys.readouterr().err
+        assert hardlinker.stats["files_linked"] == 0
+
+    def test_cache_not_opened_when_target_cannot_be_created(
+        self, tmp_path, monkeypatch
+    ):
+        source, target = tmp_path / "source", tmp_path / "target"
+        create_source(source)
+        opened = []
+        monkeypatch.setattr(core, "LinkCache", lambda *a: opened.append(a))
+
+        def makedirs(path):
+            raise PermissionError(13, "Permission denied", path)
+
+        monkeypatch.setattr(core.os, "makedirs", makedirs)
+        hardlinker = DirectoryHardlinker(cache_path=str(tmp_path / "cache.db"))
+        with pytest.raises(PermissionError):
+            hardlinker.hardlink_directory(source, target)
+        assert opened == []
+
+    def test_dry_run_does_not_create_cache(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        cache_path = tmp_path / "cache.db"
+        create_source(source)
+
+        run(source, target, cache_path, dry_run=True)
+        assert not cache_path.exists()
+
+    def test_dry_run_does_not_reset_cache(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        cache_path = tmp_path / "cache.db"
+        create_source(source)
+        run(source, target, cache_path)
+        assert cached_dirs(cache_path) == 2
+
+        run(source, target, cache_path, dry_run=True, overwrite=True)
+        assert cached_dirs(cache_path) == 2
@@ -0,0 +1,56 @@
+"""
+Tests for command-line argument validation.
+"""
+
+from mklndir import cli
+
+
+def parse(*argv):
+    return cli.create_parser().parse_args(list(argv))
+
+
+class TestValidateArguments:
+    """Test validate_arguments() error messages."""
+
+    def test_valid_arguments(self, tmp_path):
+        args = parse(str(tmp_path), str(tmp_path / "target"))
+        assert cli.validate_arguments(args) is None
+
+    def test_missing_source(self, tmp_path):
+        args = parse(str(tmp_path / "missing"), str(tmp_path / "target"))
+        assert "does not exist" in cli.validate_arguments(args)
+
+    def test_target_is_file(self, tmp_path):
+        (tmp_path / "file").write_text("x")
+        args = parse(str(tmp_path), str(tmp_path / "file"))
+        assert "not a directory" in cli.validate_arguments(args)
+
+    def test_reflink_always_unsupported(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(cli, "REFLINK_SUPPORTED", False)
+        args = parse(str(tmp_path), str(tmp_path / "target"), "--reflink", "always")
+        assert cli.validate_arguments(args) == (
+            "Reflinks are not supported on this platform"
+        )
+
+        args = parse(str(tmp_path), str(tmp_path / "target"), "--reflink", "auto")
+        assert cli.validate_arguments(args) is None
+
+    def test_cache_in_missing_directory(self, tmp_path):
+        args = parse(
+            str(tmp_path),
+            str(tmp_path / "target"),
+            "--cache",
+            str(tmp_path / "missing" / "cache.db"),
+        )
+        assert "Cache directory does not exist" in cli.validate_arguments(args)
+
+    def test_cache_with_reflink(self, tmp_path):
+        args = parse(
+            str(tmp_path),
+            str(tmp_path / "target"),
+            "--cache",
+            str(tmp_path / "cache.db"),
+            "--reflink",
+            "auto",
+        )
+        assert "--cache cannot be combined" in cli.validate_arguments(args)
@@ -0,0 +1,427 @@
+"""
+Tests for the DirectoryHardlinker core.
+"""
+
+import errno
+import fnmatch
+import os
+import stat
+import time
+
+import pytest
+
+from mklndir import core
+from mklndir.core import DirectoryHardlinker
+
+EXCLUDE_NAMES = [
+    ".tmp",
+    "a.b.tmp",
+    "x.tmp",
+    "tmp",
+    "x.tmp.bak",
+    "x.TMP",
+    "foo.",
+    "foo",
+    ".",
+    "a",
+    "ab",
+    "b.txt",
+    "c",
+    "x.tar.gz",
+    "x.gz",
+    "tar.gz",
+    "README",
+    "readme",
+    "__pycache__",
+    "notes.log",
+]
+
+EXCLUDE_PATTERNS = [
+    ["*.tmp"],
+    ["*."],
+    ["[ab]*"],
+    ["*.tar.gz"],
+    ["README"],
+    ["*.tmp", "*.log", "__pycache__"],
+    ["*.tmp", "*.", "[ab]*", "*.tar.gz", "README", "*.x?"],
+]
+
+
+def create_test_structure(path):
+    """Create a small source tree with a nested subdirectory."""
+    (path / "sub" / "deep").mkdir(parents=True)
+    (path / "a.txt").write_text("a")
+    (path / "b.log").write_text("b")
+    (path / "sub" / "c.txt").write_text("c")
+    (path / "sub" / "deep" / "d.txt").write_text("d")
+
+
+ALL_FILES = {
+    "a.txt",
+    "b.log",
+    os.path.join("sub", "c.txt"),
+    os.path.join("sub", "deep", "d.txt"),
+}
+
+
+def linked_files(source, target):
+    """Relative paths of files in target that share an inode with source."""
+    found = set()
+    for root, _, files in os.walk(source):
+        for name in files:
+            rel = os.path.relpath(os.path.join(root, name), source)
+            dst = os.path.join(target, rel)
+            if os.path.exists(dst) and os.path.samefile(os.path.join(root, name), dst):
+                found.add(rel)
+    return found
+
+
+def inode(path):
+    return os.lstat(path).st_ino
+
+
+def excluder(patterns):
+    """A DirectoryHardlinker with its exclude patterns set up for a run."""
+    hardlinker = DirectoryHardlinker()
+    names, exts, globs = hardlinker._split_exclude(patterns)
+    hardlinker._exclude_names, hardlinker._exclude_exts = names, exts
+    name_re = hardlinker._compile_exclude(globs)
+    if name_re is not None:
+        hardlinker._name_excluded = lambda name: name_re.match(name) is not None
+    return hardlinker
+
+
+@pytest.fixture
+def fake_clone(monkeypatch):
+    """
+    Make FICLONE succeed without cloning, leaving an empty separate file.
+
+    Returns a list of outcomes to give the following ioctl calls: True to
+    succeed, False to fail as unsupported. Once empty, calls succeed.
+    """
+    outcomes = []
+
+    def ioctl(fd, request, arg):
+        time.sleep(0.001)  # like a real clone, let other threads run
+        if outcomes and not outcomes.pop(0):
+            raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+        return 0
+
+    monkeypatch.setattr(core.fcntl, "ioctl", ioctl)
+    return outcomes
+
+
+class TestExcludePatterns:
+    """Test exclude pattern matching."""
+
+    def test_split_exclude_groups(self):
+        names, exts, globs = DirectoryHardlinker._split_exclude(
+            ["README", "*.tmp", "*.", "*.tar.gz", "[ab]*", "*.x?"]
+        )
+        assert names == {"README"}
+        assert exts == {"tmp", ""}
+        assert globs == ["*.tar.gz", "[ab]*", "*.x?"]
+
+    @pytest.mark.parametrize("patterns", EXCLUDE_PATTERNS)
+    def test_matches_agree_with_fnmatch(self, patterns):
+        hardlinker = excluder(patterns)
+        for name in EXCLUDE_NAMES:
+            expected = any(fnmatch.fnmatch(name, p) for p in patterns)
+            assert hardlinker._should_exclude("/src/" + name, name) == expected, name
+
+    def test_basename_patterns_skip_matching_files_anywhere(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        create_test_structure(source)
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(
+            source, target, exclude_patterns=["*.log", "c.txt"]
+        )
+        assert linked_files(source, target) == {
+            "a.txt",
+            os.path.join("sub", "deep", "d.txt"),
+        }
+        assert hardlinker.stats["skipped"] == 2
+
+    def test_basename_pattern_excludes_directory(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        create_test_structure(source)
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(source, target, exclude_patterns=["deep"])
+        assert not (target / "sub" / "deep").exists()
+        assert linked_files(source, target) == ALL_FILES - {
+            os.path.join("sub", "deep", "d.txt")
+        }
+
+    def test_path_pattern_matches_full_path(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        create_test_structure(source)
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(
+            source, target, exclude_patterns=[str(source / "sub" / "c.*")]
+        )
+        assert linked_files(source, target) == {
+            "a.txt",
+            "b.log",
+            os.path.join("sub", "deep", "d.txt"),
+        }
+
+    def test_path_pattern_with_unnormalised_source(self, tmp_path, monkeypatch):
+        create_test_structure(tmp_path / "source")
+        monkeypatch.chdir(tmp_path)
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(
+            "./source/", "target", exclude_patterns=["source/sub/*"]
+        )
+        assert linked_files("source", "target") == {"a.txt", "b.log"}
+
+
+class TestExistingTargets:
+    """Test runs into a target that already has files."""
+
+    def test_existing_targets_skipped_without_overwrite(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        create_test_structure(source)
+        target.mkdir()
+        (target / "a.txt").write_text("old")
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(source, target)
+        assert (target / "a.txt").read_text() == "old"
+        assert hardlinker.stats["skipped"] == 1
+        assert hardlinker.stats["files_linked"] == 3
+
+    def test_overwrite_replaces_existing_file(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        create_test_structure(source)
+        target.mkdir()
+        (target / "a.txt").write_text("old")
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(source, target, overwrite=True)
+        assert linked_files(source, target) == ALL_FILES
+        assert sorted(os.listdir(target)) == ["a.txt", "b.log", "sub"]
+
+    def test_overwrite_skips_files_already_linked(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        create_test_structure(source)
+        DirectoryHardlinker().hardlink_directory(source, target)
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(source, target, overwrite=True)
+        assert hardlinker.stats["skipped"] == 4
+        assert hardlinker.stats["files_linked"] == 0
+
+    def test_overwrite_with_long_name(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        name = "n" * 250
+        source.mkdir()
+        target.mkdir()
+        (source / name).write_text("new")
+        (target / name).write_text("old")
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(source, target, overwrite=True)
+        assert (target / name).samefile(source / name)
+
+    def test_overwrite_steps_over_stale_temporary_names(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        source.mkdir()
+        target.mkdir()
+        (source / "f").write_text("new")
+        (target / "f").write_text("old")
+        # Leftovers of an interrupted run with this PID, for the next names
+        start = next(core._TMP_COUNTER) + 1
+        stale = {f"{core._TMP_PREFIX}{os.getpid()}.{start + i}" for i in range(5)}
+        for name in stale:
+            (target / name).write_text("stale")
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(source, target, overwrite=True)
+        assert (target / "f").samefile(source / "f")
+        assert set(os.listdir(target)) == stale | {"f"}
+
+    def test_dry_run_overwrite_changes_nothing(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        create_test_structure(source)
+        target.mkdir()
+        (target / "a.txt").write_text("old")
+
+        hardlinker = DirectoryHardlinker(dry_run=True)
+        assert hardlinker.hardlink_directory(source, target, overwrite=True)
+        assert hardlinker.stats["files_linked"] == 4
+        assert os.listdir(target) == ["a.txt"]
+        assert (target / "a.txt").read_text() == "old"
+
+
+class TestWorkerPool:
+    """Test linking with a thread pool."""
+
+    def test_pool_links_whole_tree(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        for d in range(10):
+            (source / f"d{d}").mkdir(parents=True)
+            for f in range(20):
+                (source / f"d{d}" / f"f{f}").write_text(f"{d}.{f}")
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(source, target, workers=4)
+        assert hardlinker.stats["files_linked"] == 200
+        assert hardlinker.stats["dirs_created"] == 11
+        assert len(linked_files(source, target)) == 200
+
+    def test_pool_overwrite_and_skip(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        create_test_structure(source)
+        (target / "sub").mkdir(parents=True)
+        (target / "a.txt").write_text("old")
+        os.link(source / "sub" / "c.txt", target / "sub" / "c.txt")
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(source, target, overwrite=True, workers=4)
+        assert linked_files(source, target) == ALL_FILES
+        assert hardlinker.stats["files_linked"] == 3
+        assert hardlinker.stats["skipped"] == 1
+
+    def test_pool_counts_errors(self, tmp_path):
+        source, target = tmp_path / "source", tmp_path / "target"
+        create_test_structure(source)
+        (target / "a.txt").mkdir(parents=True)  # cannot be replaced
+
+        hardlinker = DirectoryHardlinker()
+        assert not hardlinker.hardlink_directory(
+            source, target, overwrite=True, workers=4
+        )
+        assert hardlinker.stats["errors"] == 1
+        assert hardlinker.stats["files_linked"] == 3
+
+
+class TestDirectoryDescriptors:
+    """Test linking relative to directory descriptors."""
+
+    def test_unopenable_target_directory_falls_back_to_paths(
+        self, tmp_path, monkeypatch
+    ):
+        source, target = tmp_path / "source", tmp_path / "target"
+        create_test_structure(source)
+        real_open = os.open
+
+        def open_(path, flags, *args, **kwargs):
+            if str(path).startswith(str(target)):
+                raise PermissionError(13, "Permission denied", path)
+            return real_open(path, flags, *args, **kwargs)
+
+        monkeypatch.setattr(core.os, "open", open_)
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(source, target)
+        assert hardlinker.stats["files_linked"] == 4
+        assert linked_files(source, target) == ALL_FILES
+
+
+@pytest.mark.skipif(not core.REFLINK_SUPPORTED, reason="FICLONE not available")
+class TestReflinkFallback:
+    """Test how clone failures are handled in each reflink mode."""
+
+    def test_auto_falls_back_to_hardlinks(self, tmp_path, fake_clone):
+        source, target = tmp_path / "source", tmp_path / "target"
+        create_test_structure(source)
+        fake_clone.extend([False])
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(source, target, reflink="auto")
+        assert hardlinker.stats["files_linked"] == 4
+        assert hardlinker.stats["files_reflinked"] == 0
+        assert linked_files(source, target) == ALL_FILES
+
+    def test_always_reports_unsupported_files(self, tmp_path, fake_clone):
+        source, target = tmp_path / "source", tmp_path / "target"
+        create_test_structure(source)
+        fake_clone.extend([False] * 4)
+
+        hardlinker = DirectoryHardlinker()
+        assert not hardlinker.hardlink_directory(source, target, reflink="always")
+        assert hardlinker.stats["errors"] == 4
+        assert linked_files(source, target) == set()
+        assert os.listdir(target / "sub" / "deep") == []
+
+    def test_auto_hardlinks_unreadable_file_only(
+        self, tmp_path, fake_clone, monkeypatch
+    ):
+        source, target = tmp_path / "source", tmp_path / "target"
+        source.mkdir()
+        (source / "a").write_text("a")
+        (source / "b").write_text("b")
+        real_open = os.open
+
+        def open_(path, flags, *args, **kwargs):
+            if path == "a" and flags == os.O_RDONLY:
+                raise PermissionError(13, "Permission denied", path)
+            return real_open(path, flags, *args, **kwargs)
+
+        monkeypatch.setattr(core.os, "open", open_)
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(source, target, reflink="auto")
+        assert (target / "a").samefile(source / "a")
+        assert not (target / "b").samefile(source / "b")
+        assert hardlinker.stats["files_reflinked"] == 1
+
+    def test_clone_keeps_mode_despite_umask(self, tmp_path, fake_clone):
+        source, target = tmp_path / "source", tmp_path / "target"
+        source.mkdir()
+        (source / "f").write_text("f")
+        os.chmod(source / "f", 0o777)
+        old_umask = os.umask(0o022)
+        try:
+            hardlinker = DirectoryHardlinker()
+            assert hardlinker.hardlink_directory(source, target, reflink="always")
+        finally:
+            os.umask(old_umask)
+        assert stat.S_IMODE(os.lstat(target / "f").st_mode) == 0o777
+        assert inode(target / "f") != inode(source / "f")
+
+
+@pytest.mark.skipif(not core.REFLINK_SUPPORTED, reason="FICLONE not available")
+class TestReflinkInodeTracking:
+    """Test that names sharing an inode share one clone in the target."""
+
+    def test_second_name_links_to_first_clone(self, tmp_path, fake_clone):
+        source, target = tmp_path / "source", tmp_path / "target"
+        (source / "sub").mkdir(parents=True)
+        (source / "x").write_text("x")
+        os.link(source / "x", source / "sub" / "y")
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(source, target, reflink="auto")
+        assert hardlinker.stats["files_reflinked"] == 1
+        assert hardlinker.stats["files_linked"] == 1
+        assert inode(target / "x") == inode(target / "sub" / "y")
+        assert inode(target / "x") != inode(source / "x")
+
+    def test_tracking_continues_after_auto_fallback(self, tmp_path, fake_clone):
+        source, target = tmp_path / "source", tmp_path / "target"
+        (source / "s1" / "deep").mkdir(parents=True)
+        (source / "y").write_text("y")
+        (source / "s1" / "w").write_text("w")
+        os.link(source / "y", source / "s1" / "deep" / "x")
+        fake_clone.extend([True, False])  # clone y, then refuse w
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(source, target, reflink="auto")
+        assert inode(target / "s1" / "w") == inode(source / "s1" / "w")
+        assert inode(target / "s1" / "deep" / "x") == inode(target / "y")
+
+    def test_names_linked_by_pool_share_one_clone(self, tmp_path, fake_clone):
+        source, target = tmp_path / "source", tmp_path / "target"
+        source.mkdir()
+        for i in range(50):
+            (source / f"a{i}").write_text(str(i))
+            os.link(source / f"a{i}", source / f"b{i}")
+
+        hardlinker = DirectoryHardlinker()
+        assert hardlinker.hardlink_directory(source, target, reflink="auto", workers=4)
+        assert hardlinker.stats["files_reflinked"] == 50
+        for i in range(50):
+            assert inode(target / f"a{i}") == inode(target / f"b{i}")